@@ -3,13 +3,13 @@ import streamlit as st
 import tempfile
 import os
 import pickle
-import glob
 import time
-import base64
+import io
 import re
+import hashlib
 import pandas as pd
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from utils.csv_processor import (
     load_csv,
     validate_and_process_data,
@@ -22,16 +22,59 @@ from utils.google_sheets import (
     calculate_question_statistics
 )
 from utils.api_key_manager import render_api_key_input
-from config import COMPANIES, DEFAULT_COMPANY, get_company_config
+from config import (
+    CHAT_ATTRIBUTES,
+    CHAT_SENTIMENTS,
+    COMPANIES,
+    DEFAULT_COMPANY,
+    get_company_config,
+    get_openai_api_key
+)
 
 
-def inject_custom_css():
-    """カスタムCSSを注入"""
+# 中間保存ファイルの件数サイドカーファイルの拡張子（再開判定時に全件を読み込まないため）
+SAVE_COUNT_SUFFIX = ".count"
+# 中間保存ファイルの読み書きバッファサイズ（1MiB）
+SAVE_BUFFER_SIZE = 1 << 20
+
+# 分析中の進捗表示を更新する最小間隔（秒）
+PROGRESS_UPDATE_INTERVAL = 0.1
+
+# 出力データのハッシュ値を保持するセッションステートのキー名（再実行のたびにハッシュを計算しないため）
+DATA_KEY_SESSION_KEY = "_output_data_key"
+
+# 企業選択の選択肢（設定は固定のためモジュール読み込み時に一度だけ作成）
+_COMPANY_NAMES = list(COMPANIES.keys())
+_COMPANY_INDEX = {name: i for i, name in enumerate(_COMPANY_NAMES)}
+
+# ファイル名からライブ配信名を削除するパターン（モジュール読み込み時に一度だけコンパイル）
+_LIVE_NAME_PATTERNS = [
+    # パターン1: _(...) または _(...)（半角括弧のみ）
+    re.compile(r'_\s*\([^)]*\)'),
+    # パターン2: （...） または （...）（全角括弧のみ）
+    re.compile(r'[_\s　]（[^）]*）'),
+    # パターン3: 全角スペースまたはアンダースコア + 半角開き括弧 + 任意の文字 + 全角閉じ括弧（混在パターン）
+    re.compile(r'[_\s　]\([^）]*）'),
+    # パターン4: 全角スペースまたはアンダースコア + 全角開き括弧 + 任意の文字 + 半角閉じ括弧（混在パターン）
+    re.compile(r'[_\s　]（[^)]*\)'),
+]
+
+
+@st.cache_data(show_spinner=False)
+def _load_css() -> str:
+    """カスタムCSSファイルを読み込む（プロセスごとに一度だけ読み込み、ファイルがなければ空文字列）"""
     css_file_path = os.path.join(os.path.dirname(__file__), "styles", "custom.css")
 
-    if os.path.exists(css_file_path):
-        with open(css_file_path, "r", encoding="utf-8") as f:
-            css = f.read()
+    if not os.path.exists(css_file_path):
+        return ""
+    with open(css_file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def inject_custom_css():
+    """カスタムCSSを注入"""
+    css = _load_css()
+    if css:
         st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
 
 
@@ -45,19 +88,39 @@ def remove_live_name_from_filename(filename: str) -> str:
     Returns:
         ライブ配信名を削除したファイル名
     """
-    # パターン1: _(...) または _(...)（半角括弧のみ）
-    filename = re.sub(r'_\s*\([^)]*\)', '', filename)
-    # パターン2: （...） または （...）（全角括弧のみ）
-    filename = re.sub(r'[_\s　]（[^）]*）', '', filename)
-    # パターン3: 全角スペースまたはアンダースコア + 半角開き括弧 + 任意の文字 + 全角閉じ括弧（混在パターン）
-    filename = re.sub(r'[_\s　]\([^）]*）', '', filename)
-    # パターン4: 全角スペースまたはアンダースコア + 全角開き括弧 + 任意の文字 + 半角閉じ括弧（混在パターン）
-    filename = re.sub(r'[_\s　]（[^)]*\)', '', filename)
+    # パターン1〜4を順番に適用（コンパイル済みパターンを使用）
+    for pattern in _LIVE_NAME_PATTERNS:
+        filename = pattern.sub('', filename)
     # パターン5: 末尾の空白を削除
     filename = filename.strip()
     return filename
 
 
+def get_default_filename_base() -> str:
+    """
+    アップロードされたファイル名からダウンロード用のデフォルトのファイル名ベースを生成
+    
+    Returns:
+        「コメント分析_(アップロードされたファイル名)」形式のファイル名ベース（拡張子なし）
+    """
+    uploaded_filename_base = st.session_state.get("uploaded_csv_filename", "")
+    if uploaded_filename_base:
+        return f"コメント分析_{uploaded_filename_base}"
+    return "コメント分析"
+
+
+def ensure_csv_filename_base() -> str:
+    """
+    分析結果CSVのファイル名ベースを取得（未設定の場合はデフォルト値を設定）
+    
+    Returns:
+        ファイル名ベース（拡張子なし）
+    """
+    if not st.session_state.get("csv_filename_base"):  # Noneまたは空文字列の場合
+        st.session_state.csv_filename_base = get_default_filename_base()
+    return st.session_state.csv_filename_base
+
+
 def calculate_api_cost(prompt_tokens: int, completion_tokens: int) -> float:
     """
     API使用料金を計算（GPT-4o-mini）
@@ -78,24 +141,76 @@ def calculate_api_cost(prompt_tokens: int, completion_tokens: int) -> float:
     return input_cost + output_cost
 
 
-def create_download_link(data: bytes, filename: str, mime_type: str) -> str:
+def render_download_button(label: str, data: bytes, filename: str, mime_type: str, key: str):
     """
-    Base64エンコードしたダウンロードリンクを作成
+    ダウンロードボタンを表示（Base64のdata URIを埋め込まず、クリック時にバイト列をそのまま送信）
     
     Args:
+        label: ファイルの種類（例: 分析結果CSV）
         data: ファイルデータ（バイト）
         filename: ファイル名
         mime_type: MIMEタイプ
+        key: ウィジェットのキー
+    """
+    st.download_button(
+        label=f"📥 {label}: {filename}",
+        data=data,
+        file_name=filename,
+        mime=mime_type,
+        key=key
+    )
+
+
+def broadcast_time_to_seconds(times: pd.Series) -> pd.Series:
+    """
+    配信時間（HH:MM形式、後方互換性のためHH:MM:SSにも対応）を秒数に変換（ソート用）
+    
+    Args:
+        times: 配信時間のSeries
         
     Returns:
-        HTMLリンク文字列
+        秒数のSeries（パースできない値は0）
     """
-    b64 = base64.b64encode(data).decode()
-    href = f'<a href="data:{mime_type};base64,{b64}" download="{filename}" style="color: #1f77b4; text-decoration: underline; font-weight: bold;">📥 {filename}</a>'
-    return href
+    if times.empty:
+        return pd.Series(0, index=times.index, dtype="int64")
+    
+    # 列単位でまとめて分割・数値変換（行ごとのPython呼び出しを避ける）
+    parts = times.astype(str).str.split(':', expand=True)
+    if parts.shape[1] < 2:
+        # コロンを含む値が1つもない場合はすべて0
+        return pd.Series(0, index=times.index, dtype="int64")
+    
+    hours = pd.to_numeric(parts[0], errors='coerce')
+    minutes = pd.to_numeric(parts[1], errors='coerce')
+    total = hours * 3600 + minutes * 60
+    if parts.shape[1] >= 3:
+        # 秒がある行のみ加算（HH:MM形式の行は秒なしとして扱う）
+        seconds = pd.to_numeric(parts[2], errors='coerce')
+        total = total + seconds.where(parts[2].notna(), 0)
+    
+    # パースに失敗した値は0
+    return total.fillna(0).astype("int64")
 
 
-def generate_completed_csv(df: pd.DataFrame, stats: Dict) -> str:
+def calculate_user_ranking(df: pd.DataFrame, top_n: int = 10) -> Dict:
+    """
+    ユーザーコメント数ランキングを集計
+    
+    Args:
+        df: データフレーム
+        top_n: 上位何名まで集計するか
+        
+    Returns:
+        ユーザー名とコメント数の辞書（コメント数の多い順、username列がない場合は空）
+    """
+    if 'username' not in df.columns:
+        return {}
+    counts = df['username'].value_counts()
+    # カテゴリ型の場合は出現しないユーザー（件数0）も含まれるため除外
+    return counts[counts > 0].head(top_n).to_dict()
+
+
+def generate_completed_csv(df: pd.DataFrame, stats: Dict) -> bytes:
     """
     分析結果CSV形式で出力する関数
     
@@ -104,7 +219,7 @@ def generate_completed_csv(df: pd.DataFrame, stats: Dict) -> str:
         stats: 統計情報
         
     Returns:
-        分析結果CSV文字列
+        分析結果CSVのバイト列（UTF-8 BOM付き）
     """
     # 統計情報をCSV形式の文字列として作成
     stats_lines = []
@@ -122,70 +237,49 @@ def generate_completed_csv(df: pd.DataFrame, stats: Dict) -> str:
     stats_lines.append("属性,件数,,チャット感情別件数,件数,,ユーザーコメント数ランキング,コメント数")
     
     # 属性別件数、感情別件数、ランキングを取得
-    from config import CHAT_ATTRIBUTES, CHAT_SENTIMENTS
     attribute_counts = stats.get('attribute_counts', {})
     sentiment_counts = stats.get('sentiment_counts', {})
     
-    # すべての属性カテゴリを含む辞書を作成（存在しないものは0）
-    all_attribute_counts = {}
-    for attr in CHAT_ATTRIBUTES:
-        all_attribute_counts[attr] = attribute_counts.get(attr, 0)
+    # すべての属性カテゴリを設定の順序で並べる（存在しないものは0）
+    attr_items = [(attr, attribute_counts.get(attr, 0)) for attr in CHAT_ATTRIBUTES]
     
-    # すべての感情カテゴリを含む辞書を作成（存在しないものは0）
-    all_sentiment_counts = {}
-    for sent in CHAT_SENTIMENTS:
-        all_sentiment_counts[sent] = sentiment_counts.get(sent, 0)
+    # すべての感情カテゴリを設定の順序で並べる（存在しないものは0）
+    sentiment_items = [(sent, sentiment_counts.get(sent, 0)) for sent in CHAT_SENTIMENTS]
     
     # ユーザーコメント数ランキング（上位10名）
-    user_counts = {}
-    if 'username' in df.columns:
-        user_counts = df['username'].value_counts().head(10).to_dict()
+    user_counts = calculate_user_ranking(df)
     
     # 最大行数を計算（属性、感情、ランキングの最大値）
     max_rows = max(
-        len(all_attribute_counts),
-        len(all_sentiment_counts),
+        len(attr_items),
+        len(sentiment_items),
         len(user_counts),
         1  # 最小1行
     )
     
-    # 属性、感情、ランキングをリストに変換（順序保持）
-    attr_items = list(all_attribute_counts.items())
-    sentiment_items = list(all_sentiment_counts.items())
+    # ランキングをリストに変換（順序保持）
     user_items = list(user_counts.items())
     
-    # データ行を生成（横並び形式）
-    for i in range(max_rows):
-        # 属性
-        if i < len(attr_items):
-            attr_name, attr_count = attr_items[i]
-            attr_part = f"{attr_name},{attr_count}"
-        else:
-            attr_part = ","
-        
-        # 空白列
-        empty_col = ""
-        
-        # チャット感情別件数
-        if i < len(sentiment_items):
-            sent_name, sent_count = sentiment_items[i]
-            sentiment_part = f"{sent_name},{sent_count}"
-        else:
-            sentiment_part = ","
-        
-        # 空白列
-        empty_col2 = ""
-        
-        # ユーザーコメント数ランキング
-        if i < len(user_items):
-            user_name, user_count = user_items[i]
-            user_part = f"{user_name},{user_count}"
-        else:
-            user_part = ","
-        
-        # 1行に結合
-        row = f"{attr_part},,{sentiment_part},,{user_part}"
-        stats_lines.append(row)
+    # 各項目を最大行数まで空欄で埋める
+    blank = ("", "")
+    attr_items += [blank] * (max_rows - len(attr_items))
+    sentiment_items += [blank] * (max_rows - len(sentiment_items))
+    user_items += [blank] * (max_rows - len(user_items))
+    
+    # データ行を生成（横並び形式：属性,件数,,感情,件数,,ユーザー名,コメント数）
+    stats_table = pd.DataFrame({
+        "attr_name": [name for name, _ in attr_items],
+        "attr_count": [count for _, count in attr_items],
+        "empty_col": "",
+        "sent_name": [name for name, _ in sentiment_items],
+        "sent_count": [count for _, count in sentiment_items],
+        "empty_col2": "",
+        "user_name": [name for name, _ in user_items],
+        "user_count": [count for _, count in user_items],
+    })
+    stats_lines.append(
+        stats_table.to_csv(index=False, header=False, lineterminator="\n").rstrip("\n")
+    )
     
     # 空行を追加
     stats_lines.append("")
@@ -209,36 +303,113 @@ def generate_completed_csv(df: pd.DataFrame, stats: Dict) -> str:
     # 配信時間で昇順ソート
     if '配信時間' in output_df.columns:
         # 配信時間をパースしてソート（HH:MM形式、後方互換性のためHH:MM:SSにも対応）
-        def parse_time(time_str):
-            try:
-                parts = str(time_str).split(':')
-                if len(parts) >= 3:
-                    hours, minutes, seconds = int(parts[0]), int(parts[1]), int(parts[2])
-                    return hours * 3600 + minutes * 60 + seconds
-                elif len(parts) == 2:
-                    hours, minutes = int(parts[0]), int(parts[1])
-                    return hours * 3600 + minutes * 60
-                return 0
-            except (ValueError, IndexError):
-                return 0
-        
-        output_df['_sort_time'] = output_df['配信時間'].apply(parse_time)
+        output_df['_sort_time'] = broadcast_time_to_seconds(output_df['配信時間'])
         output_df = output_df.sort_values('_sort_time', ascending=True)
         output_df = output_df.drop(columns=['_sort_time'])
     
     # 統計情報をCSV文字列に変換
     stats_csv = "\n".join(stats_lines)
     
-    # データフレームをCSV文字列に変換
-    data_csv = output_df.to_csv(index=False)
+    # 統計情報とデータをバッファに直接書き込む（CSV全体の文字列コピーを作らない）
+    buf = io.BytesIO()
+    buf.write((stats_csv + "\n").encode('utf-8-sig'))
+    output_df.to_csv(buf, index=False, encoding='utf-8', lineterminator="\n")
+    
+    return buf.getvalue()
+
+
+def _hash_dataframe(df: pd.DataFrame) -> str:
+    """DataFrameの列名・型・内容全体からハッシュ値を計算"""
+    hasher = hashlib.sha1()
+    hasher.update(repr(tuple(df.columns)).encode())
+    hasher.update(repr(tuple(str(dtype) for dtype in df.dtypes)).encode())
+    hasher.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return hasher.hexdigest()
+
+
+def get_data_key(df: pd.DataFrame) -> str:
+    """
+    キャッシュのキーとして使うDataFrameのハッシュ値を取得
     
-    # 統計情報とデータを結合
-    combined_csv = stats_csv + "\n" + data_csv
+    同じDataFrameオブジェクトに対してはセッションステートに保持した値を返すため、
+    ファイル名の変更などによる再実行ではデータ全体のハッシュ計算を行わない
     
-    return combined_csv
+    Args:
+        df: データフレーム
+        
+    Returns:
+        DataFrameのハッシュ値
+    """
+    cached = st.session_state.get(DATA_KEY_SESSION_KEY)
+    if cached is not None and cached[0] is df:
+        return cached[1]
+    data_key = _hash_dataframe(df)
+    st.session_state[DATA_KEY_SESSION_KEY] = (df, data_key)
+    return data_key
 
 
-def generate_question_csv(question_df: pd.DataFrame) -> str:
+@st.cache_data(max_entries=4, show_spinner=False)
+def build_completed_csv_bytes(data_key: str, _df: pd.DataFrame, stats: Dict) -> bytes:
+    """
+    分析結果CSVを生成（データと統計情報が同じ場合は生成済みのバイト列を再利用）
+    
+    Args:
+        data_key: データフレームのハッシュ値（get_data_keyで取得、キャッシュのキー）
+        _df: データフレーム（キャッシュのキーには含めない）
+        stats: 統計情報
+        
+    Returns:
+        分析結果CSVのバイト列（UTF-8 BOM付き）
+    """
+    return generate_completed_csv(_df, stats)
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_csv_cached(content: bytes) -> pd.DataFrame:
+    """
+    CSVを読み込んで処理（同じ内容のファイルの場合は読み込み済みの結果を再利用）
+    
+    Args:
+        content: アップロードされたCSVファイルの内容
+        
+    Returns:
+        処理済みデータフレーム
+    """
+    return validate_and_process_data(load_csv(io.BytesIO(content)))
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def load_csv_with_elapsed_time_cached(content: bytes) -> pd.DataFrame:
+    """
+    elapsed_timeカラムを含むCSVを読み込む（同じ内容のファイルの場合は読み込み済みの結果を再利用）
+    
+    Args:
+        content: アップロードされたCSVファイルの内容
+        
+    Returns:
+        読み込んだデータフレーム（配信時間カラムが追加される）
+    """
+    return load_csv_with_elapsed_time(io.BytesIO(content))
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def compute_output_statistics(data_key: str, _df: pd.DataFrame) -> Tuple[Dict, Dict, pd.DataFrame]:
+    """
+    統計情報と質問コメントを計算（データが同じ場合は計算済みの結果を再利用）
+    
+    Args:
+        data_key: データフレームのハッシュ値（get_data_keyで取得、キャッシュのキー）
+        _df: 分析済みデータフレーム（キャッシュのキーには含めない）
+        
+    Returns:
+        (全体の統計情報, 質問コメントの統計情報, 質問コメントのデータフレーム)
+    """
+    question_df = extract_questions(_df)
+    question_df["回答状況"] = "未回答"
+    return calculate_statistics(_df), calculate_question_statistics(question_df), question_df
+
+
+def generate_question_csv(question_df: pd.DataFrame) -> bytes:
     """
     質問コメント専用のCSV形式で出力する関数
     
@@ -246,7 +417,7 @@ def generate_question_csv(question_df: pd.DataFrame) -> str:
         question_df: 質問コメントのみのデータフレーム（配信時間, username, original_textを含む）
         
     Returns:
-        質問コメントCSV文字列
+        質問コメントCSVのバイト列（UTF-8 BOM付き）
     """
     if question_df.empty:
         # 空のDataFrameの場合は、件数0とヘッダーのみを返す
@@ -254,7 +425,7 @@ def generate_question_csv(question_df: pd.DataFrame) -> str:
         csv_lines.append("質問件数,=COUNTA(B:B)-1")
         csv_lines.append("")
         csv_lines.append("配信時間,username,original_text")
-        return "\n".join(csv_lines)
+        return "\n".join(csv_lines).encode('utf-8-sig')
     
     # CSV形式の文字列として作成
     csv_lines = []
@@ -289,33 +460,19 @@ def generate_question_csv(question_df: pd.DataFrame) -> str:
     # 配信時間で昇順ソート
     if '配信時間' in output_df.columns:
         # 配信時間をパースしてソート（HH:MM形式、後方互換性のためHH:MM:SSにも対応）
-        def parse_time(time_str):
-            try:
-                parts = str(time_str).split(':')
-                if len(parts) >= 3:
-                    hours, minutes, seconds = int(parts[0]), int(parts[1]), int(parts[2])
-                    return hours * 3600 + minutes * 60 + seconds
-                elif len(parts) == 2:
-                    hours, minutes = int(parts[0]), int(parts[1])
-                    return hours * 3600 + minutes * 60
-                return 0
-            except (ValueError, IndexError):
-                return 0
-        
-        output_df['_sort_time'] = output_df['配信時間'].apply(parse_time)
+        output_df['_sort_time'] = broadcast_time_to_seconds(output_df['配信時間'])
         output_df = output_df.sort_values('_sort_time', ascending=True)
         output_df = output_df.drop(columns=['_sort_time'])
     
-    # データフレームをCSV文字列に変換（ヘッダーは既に追加済みのためheader=False）
-    data_csv = output_df.to_csv(index=False, header=False)
-    
-    # ヘッダーとデータを結合
-    combined_csv = "\n".join(csv_lines) + "\n" + data_csv
+    # ヘッダーとデータをバッファに直接書き込む（ヘッダーは既に追加済みのためheader=False）
+    buf = io.BytesIO()
+    buf.write(("\n".join(csv_lines) + "\n").encode('utf-8-sig'))
+    output_df.to_csv(buf, index=False, header=False, encoding='utf-8', lineterminator="\n")
     
-    return combined_csv
+    return buf.getvalue()
 
 
-def add_statistics_to_csv(df: pd.DataFrame, stats: Dict, is_question: bool = False, question_stats: Optional[Dict] = None) -> str:
+def add_statistics_to_csv(df: pd.DataFrame, stats: Dict, is_question: bool = False, question_stats: Optional[Dict] = None) -> bytes:
     """
     CSVに統計情報を追加（グラフ作成しやすいレイアウト）
     
@@ -326,7 +483,7 @@ def add_statistics_to_csv(df: pd.DataFrame, stats: Dict, is_question: bool = Fal
         question_stats: 質問統計情報（質問CSVの場合のみ）
         
     Returns:
-        統計情報が追加されたCSV文字列
+        統計情報が追加されたCSVのバイト列（UTF-8 BOM付き）
     """
     # 統計情報をCSV形式の文字列として作成
     stats_lines = []
@@ -356,7 +513,7 @@ def add_statistics_to_csv(df: pd.DataFrame, stats: Dict, is_question: bool = Fal
         
         # ユーザーコメント数ランキング（上位10名）
         if 'username' in df.columns:
-            user_counts = df['username'].value_counts().head(10)
+            user_counts = calculate_user_ranking(df)
             stats_lines.append("ユーザーコメント数ランキング")
             stats_lines.append("ユーザー名,コメント数")
             for username, count in user_counts.items():
@@ -368,13 +525,89 @@ def add_statistics_to_csv(df: pd.DataFrame, stats: Dict, is_question: bool = Fal
     # 統計情報をCSV文字列に変換
     stats_csv = "\n".join(stats_lines)
     
-    # データフレームをCSV文字列に変換
-    data_csv = df.to_csv(index=False)
+    # 統計情報とデータをバッファに直接書き込む（CSV全体の文字列コピーを作らない）
+    buf = io.BytesIO()
+    buf.write((stats_csv + "\n").encode('utf-8-sig'))
+    df.to_csv(buf, index=False, encoding='utf-8', lineterminator="\n")
+    
+    return buf.getvalue()
+
+
+def find_latest_save_file(save_dir: str) -> Optional[str]:
+    """
+    保存ディレクトリから最新の中間保存ファイルを検索
+    
+    ディレクトリを1回走査し、各エントリのstat情報から更新日時を比較する
+    
+    Args:
+        save_dir: 保存ディレクトリのパス
+        
+    Returns:
+        最新の中間保存ファイルのパス、なければNone
+    """
+    latest_path = None
+    latest_mtime = -1.0
+    try:
+        with os.scandir(save_dir) as entries:
+            for entry in entries:
+                if not (entry.name.startswith("analysis_save_") and entry.name.endswith(".pkl")):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                if mtime > latest_mtime:
+                    latest_path = entry.path
+                    latest_mtime = mtime
+    except OSError:
+        return None
+    return latest_path
+
+
+def get_saved_result_count(save_path: str) -> int:
+    """
+    中間保存ファイルに保存されている分析結果の件数を取得
+    
+    件数のサイドカーファイル（.count）があればそれを読み込み、
+    なければ（古い保存ファイルの場合）保存ファイル全体を読み込んで件数を数える
     
-    # 統計情報とデータを結合
-    combined_csv = stats_csv + "\n" + data_csv
+    Args:
+        save_path: 中間保存ファイルのパス
+        
+    Returns:
+        保存されている件数（読み込めない場合は0）
+    """
+    try:
+        with open(save_path + SAVE_COUNT_SUFFIX, 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        pass
     
-    return combined_csv
+    try:
+        with open(save_path, 'rb', buffering=SAVE_BUFFER_SIZE) as f:
+            saved_data = pickle.load(f)
+        if isinstance(saved_data, (list, pd.DataFrame)):
+            return len(saved_data)
+    except Exception:
+        pass
+    return 0
+
+
+def remove_saved_results(save_path: Optional[str]):
+    """
+    中間保存ファイルと件数のサイドカーファイルを削除
+    
+    Args:
+        save_path: 中間保存ファイルのパス
+    """
+    if not save_path:
+        return
+    for path in (save_path, save_path + SAVE_COUNT_SUFFIX):
+        if os.path.exists(path):
+            try:
+                os.remove(path)
+            except Exception:
+                pass
 
 
 def format_remaining_time(seconds: float) -> str:
@@ -390,23 +623,20 @@ def format_remaining_time(seconds: float) -> str:
     if seconds < 0:
         return "あと0秒"
     
-    total_seconds = int(seconds)
+    hours, rem = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rem, 60)
     
     # 1時間以上の場合
-    if total_seconds >= 3600:
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
+    if hours:
         return f"あと{hours}時間{minutes}分"
     
     # 1分以上1時間未満の場合
-    elif total_seconds >= 60:
-        minutes = total_seconds // 60
-        secs = total_seconds % 60
+    elif minutes:
         return f"あと{minutes}分{secs}秒"
     
     # 1分未満の場合
     else:
-        return f"あと{total_seconds}秒"
+        return f"あと{secs}秒"
 
 
 def main():
@@ -449,16 +679,8 @@ def show_comment_analysis_page():
         st.session_state.analysis_original_df = None
     if "analysis_cancelled" not in st.session_state:
         st.session_state.analysis_cancelled = False
-    if "csv_completed_data" not in st.session_state:
-        st.session_state.csv_completed_data = None
     if "csv_completed_filename" not in st.session_state:
         st.session_state.csv_completed_filename = None
-    if "stats_data" not in st.session_state:
-        st.session_state.stats_data = None
-    if "question_stats_data" not in st.session_state:
-        st.session_state.question_stats_data = None
-    if "question_df_data" not in st.session_state:
-        st.session_state.question_df_data = None
     if "uploaded_csv_filename" not in st.session_state:
         st.session_state.uploaded_csv_filename = ""
     if "csv_filename_base" not in st.session_state:
@@ -512,31 +734,26 @@ def show_comment_analysis_page():
             uploaded_filename_base = remove_live_name_from_filename(uploaded_filename_base)
             st.session_state.uploaded_csv_filename = uploaded_filename_base
             
-            # 一時ファイルに保存
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_path = tmp_file.name
-            
-            # CSVを読み込んで処理
+            # CSVを読み込んで処理（同じファイルの再実行時はキャッシュから取得）
             with st.spinner("CSVファイルを読み込んでいます..."):
+                content = uploaded_file.getvalue()
                 # elapsed_timeカラムがあるかどうかをチェック
                 try:
-                    # まずファイルを読み込んでelapsed_timeカラムがあるかチェック
-                    test_df = pd.read_csv(tmp_path, encoding='utf-8-sig', nrows=1)
-                    has_elapsed_time = 'elapsed_time' in test_df.columns
+                    # まずヘッダー行のみを読み込んでelapsed_timeカラムがあるかチェック
+                    # （一時ファイルを介さず、アップロードされたファイルの内容から直接読み込む）
+                    header_cols = pd.read_csv(io.BytesIO(content), encoding='utf-8-sig', nrows=0).columns
+                    has_elapsed_time = 'elapsed_time' in header_cols
                     
                     if has_elapsed_time:
                         # elapsed_timeカラムがある場合は新しい処理を使用
-                        df = load_csv_with_elapsed_time(tmp_path)
+                        df = load_csv_with_elapsed_time_cached(content)
                     else:
                         # elapsed_timeカラムがない場合は既存の処理を使用
-                        df = load_csv(tmp_path)
-                        df = validate_and_process_data(df)
+                        df = load_csv_cached(content)
                 except Exception as e:
                     # エラーが発生した場合は既存の処理にフォールバック
                     st.warning(f"elapsed_timeカラムの検出中にエラーが発生しました。既存の処理を使用します: {str(e)}")
-                    df = load_csv(tmp_path)
-                    df = validate_and_process_data(df)
+                    df = load_csv_cached(content)
                 
                 st.session_state.processed_data = df
                 st.session_state.analysis_complete = False
@@ -546,21 +763,16 @@ def show_comment_analysis_page():
             st.subheader("データプレビュー")
             st.dataframe(df.head(10), use_container_width=True)
             
-            # 一時ファイルを削除
-            os.unlink(tmp_path)
-            
         except Exception as e:
             st.error(f"エラー: {str(e)}")
             return
     
     # 企業選択（メインエリアに移動）
     st.header("2. 企業選択")
-    company_names = list(COMPANIES.keys())
-    
     selected_company = st.selectbox(
         "企業を選択してください",
-        company_names,
-        index=company_names.index(st.session_state.selected_company) if st.session_state.selected_company in company_names else 0
+        _COMPANY_NAMES,
+        index=_COMPANY_INDEX.get(st.session_state.selected_company, 0)
     )
     
     # 企業選択が変更された場合、セッションステートを更新
@@ -570,15 +782,6 @@ def show_comment_analysis_page():
         if "analysis_complete" in st.session_state:
             st.session_state.analysis_complete = False
         # 注意: processed_dataは保持する（アップロード済みのCSVデータは残す）
-        # 分析結果だけをクリアするため、stats_dataなどもクリア
-        if "stats_data" in st.session_state:
-            st.session_state.stats_data = None
-        if "question_stats_data" in st.session_state:
-            st.session_state.question_stats_data = None
-        if "question_df_data" in st.session_state:
-            st.session_state.question_df_data = None
-        if "csv_completed_data" in st.session_state:
-            st.session_state.csv_completed_data = None
     
     # 現在の企業設定を取得
     company_config = get_company_config(selected_company)
@@ -588,7 +791,8 @@ def show_comment_analysis_page():
     if st.session_state.processed_data is not None and not st.session_state.analysis_complete:
         st.header("3. AI分析")
         
-        df = st.session_state.processed_data.copy()
+        # 読み取りのみのため参照を使用（再開用の元データを確保する箇所でのみコピーする）
+        df = st.session_state.processed_data
         
         # 分析途中の結果があるかチェック（PCスリープ対策）
         analysis_resume_available = False
@@ -597,26 +801,15 @@ def show_comment_analysis_page():
         # 保存ファイルのパスを検索（セッションステートにない場合でも検索）
         if not st.session_state.analysis_save_path:
             # 一時ディレクトリから最新の保存ファイルを検索
-            save_dir = tempfile.gettempdir()
-            save_files = glob.glob(os.path.join(save_dir, "analysis_save_*.pkl"))
-            if save_files:
+            latest_file = find_latest_save_file(tempfile.gettempdir())
+            if latest_file:
                 # 最新のファイルを使用
-                latest_file = max(save_files, key=os.path.getmtime)
                 st.session_state.analysis_save_path = latest_file
         
         if st.session_state.analysis_save_path and os.path.exists(st.session_state.analysis_save_path):
-            try:
-                with open(st.session_state.analysis_save_path, 'rb') as f:
-                    saved_data = pickle.load(f)
-                    if saved_data:
-                        if isinstance(saved_data, list):
-                            saved_count = len(saved_data)
-                        elif isinstance(saved_data, pd.DataFrame):
-                            saved_count = len(saved_data)
-                        if saved_count > 0:
-                            analysis_resume_available = True
-            except Exception:
-                pass
+            saved_count = get_saved_result_count(st.session_state.analysis_save_path)
+            if saved_count > 0:
+                analysis_resume_available = True
         
         if analysis_resume_available:
             st.warning(f"⚠️ 分析が途中で中断されました。{saved_count}件の分析結果が保存されています。続きから再開できます。")
@@ -631,11 +824,7 @@ def show_comment_analysis_page():
             with col2:
                 if st.button("最初から開始"):
                     # 保存ファイルを削除
-                    if st.session_state.analysis_save_path and os.path.exists(st.session_state.analysis_save_path):
-                        try:
-                            os.remove(st.session_state.analysis_save_path)
-                        except Exception:
-                            pass
+                    remove_saved_results(st.session_state.analysis_save_path)
                     st.session_state.analysis_resume = False
                     st.session_state.analysis_save_path = None
                     st.session_state.analysis_original_df = None
@@ -657,7 +846,6 @@ def show_comment_analysis_page():
         if start_analysis or st.session_state.get("analysis_resume", False):
             # APIキー事前チェック
             try:
-                from config import get_openai_api_key
                 if not get_openai_api_key():
                     st.error("OpenAI APIキーが未設定です。サイドバーから設定してください。")
                     return
@@ -693,17 +881,23 @@ def show_comment_analysis_page():
             
             # 開始時刻を記録
             start_time = time.time()
+            # 最後に進捗表示を更新した時刻（表示更新の間引き用）
+            last_update = [0.0]
             
             def update_progress(current, total):
+                # 表示更新は最大10回/秒に間引く（完了時は必ず更新）
+                now = time.time()
+                if now - last_update[0] < PROGRESS_UPDATE_INTERVAL and current != total:
+                    return
+                last_update[0] = now
+                
                 progress = current / total
                 progress_bar.progress(progress)
                 
                 # 経過時間の計算
-                elapsed_time = time.time() - start_time
-                elapsed_seconds = int(elapsed_time)
-                hours = elapsed_seconds // 3600
-                minutes = (elapsed_seconds % 3600) // 60
-                seconds = elapsed_seconds % 60
+                elapsed_time = now - start_time
+                hours, rem = divmod(int(elapsed_time), 3600)
+                minutes, seconds = divmod(rem, 60)
                 elapsed_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
                 
                 # 予想完了時間の計算
@@ -728,15 +922,18 @@ def show_comment_analysis_page():
                 if action == "save" and results is not None:
                     # 結果を保存
                     try:
-                        with open(save_path, 'wb') as f:
-                            pickle.dump(results, f)
+                        with open(save_path, 'wb', buffering=SAVE_BUFFER_SIZE) as f:
+                            pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+                        # 再開判定用に件数だけをサイドカーファイルに保存
+                        with open(save_path + SAVE_COUNT_SUFFIX, 'w') as f:
+                            f.write(str(len(results)))
                     except Exception as e:
                         print(f"保存エラー: {e}")
                 elif action == "load":
                     # 保存された結果を読み込む
                     if save_path and os.path.exists(save_path):
                         try:
-                            with open(save_path, 'rb') as f:
+                            with open(save_path, 'rb', buffering=SAVE_BUFFER_SIZE) as f:
                                 saved_results = pickle.load(f)
                                 return saved_results
                         except Exception as e:
@@ -744,11 +941,7 @@ def show_comment_analysis_page():
                     return None
                 elif action == "clear":
                     # 一時ファイルを削除
-                    if save_path and os.path.exists(save_path):
-                        try:
-                            os.remove(save_path)
-                        except Exception:
-                            pass
+                    remove_saved_results(save_path)
             
             def check_cancel():
                 """中断フラグをチェック"""
@@ -797,27 +990,15 @@ def show_comment_analysis_page():
                 
                 # CSVファイルを自動生成（分析完了時に自動実行）
                 try:
-                    # デフォルトのファイル名を生成（アップロードされたファイル名を含む）
-                    uploaded_filename_base = st.session_state.get("uploaded_csv_filename", "")
-                    if uploaded_filename_base:
-                        default_file_title = f"コメント分析_{uploaded_filename_base}"
-                    else:
-                        default_file_title = "コメント分析"
-                    
-                    # 統計情報を計算（後でCSVに追加するため）
-                    temp_stats = calculate_statistics(analyzed_df)
+                    # 統計情報を計算（後でCSVに追加するため、結果はキャッシュされデータ出力時に再利用）
+                    temp_stats, _, _ = compute_output_statistics(get_data_key(analyzed_df), analyzed_df)
                     
                     # 分析結果CSV形式で出力
                     try:
-                        # 分析結果CSV形式で出力
-                        completed_csv = generate_completed_csv(analyzed_df, temp_stats)
-                        st.session_state.csv_completed_data = completed_csv.encode('utf-8-sig')
+                        # 分析結果CSVを生成してキャッシュに保持（ダウンロード時はキャッシュから取得）
+                        build_completed_csv_bytes(get_data_key(analyzed_df), analyzed_df, temp_stats)
                         # セッションステートのファイル名ベースを使用（なければデフォルト値）
-                        filename_base = st.session_state.get("csv_filename_base")
-                        if not filename_base:  # Noneまたは空文字列の場合
-                            filename_base = default_file_title
-                            st.session_state.csv_filename_base = default_file_title
-                        st.session_state.csv_completed_filename = f"{filename_base}_分析結果.csv"
+                        st.session_state.csv_completed_filename = f"{ensure_csv_filename_base()}_分析結果.csv"
                     except Exception as e:
                         # 分析結果CSV生成エラーは無視（後で再生成可能）
                         print(f"分析結果CSV生成エラー: {e}")
@@ -825,24 +1006,14 @@ def show_comment_analysis_page():
                     # CSV生成エラーは無視（後で再生成可能）
                     print(f"CSV自動生成エラー: {e}")
                 
-                # 統計情報を計算してセッションステートに保存
-                question_df = extract_questions(analyzed_df)
-                question_df["回答状況"] = "未回答"
-                st.session_state.stats_data = calculate_statistics(analyzed_df)
-                st.session_state.question_stats_data = calculate_question_statistics(question_df)
-                st.session_state.question_df_data = question_df
+                # 質問コメントを取得（計算済みの場合はキャッシュから取得）
+                _, _, question_df = compute_output_statistics(get_data_key(analyzed_df), analyzed_df)
                 
                 # 質問コメントCSVを自動生成
                 try:
-                    question_csv = generate_question_csv(question_df)
-                    st.session_state.question_csv_data = question_csv.encode('utf-8-sig')
+                    st.session_state.question_csv_data = generate_question_csv(question_df)
                     # ファイル名を生成（元のファイル名ベースに「_質問コメ」を追加）
-                    uploaded_filename_base = st.session_state.get("uploaded_csv_filename", "")
-                    if uploaded_filename_base:
-                        question_filename = f"コメント分析_{uploaded_filename_base}_質問コメ.csv"
-                    else:
-                        question_filename = "コメント分析_質問コメ.csv"
-                    st.session_state.question_csv_filename = question_filename
+                    st.session_state.question_csv_filename = f"{get_default_filename_base()}_質問コメ.csv"
                 except Exception as e:
                     # 質問コメントCSV生成エラーを可視化（デプロイ先でもエラーが見えるように）
                     error_msg = f"質問コメントCSV生成エラー: {str(e)}"
@@ -921,19 +1092,12 @@ def show_comment_analysis_page():
     if st.session_state.analysis_complete and st.session_state.processed_data is not None:
         st.header("3. データ出力")
         
-        # 統計情報をセッションステートから取得（なければ計算）
-        if st.session_state.stats_data is None:
-            df = st.session_state.processed_data.copy()
-            question_df = extract_questions(df)
-            question_df["回答状況"] = "未回答"
-            st.session_state.stats_data = calculate_statistics(df)
-            st.session_state.question_stats_data = calculate_question_statistics(question_df)
-            st.session_state.question_df_data = question_df
-        
-        df = st.session_state.processed_data.copy()
-        stats = st.session_state.stats_data
-        question_stats = st.session_state.question_stats_data
-        question_df = st.session_state.question_df_data
+        # 以降の処理はdfを変更しないため参照を使用（コピーしない）
+        df = st.session_state.processed_data
+        # データのハッシュ値（同じデータの再実行ではセッションステートから取得）
+        data_key = get_data_key(df)
+        # 統計情報を取得（データが変わらない限りキャッシュから取得）
+        stats, question_stats, question_df = compute_output_statistics(data_key, df)
         
         # 統計情報を常に表示（エラー時も表示される）
         st.subheader("統計情報")
@@ -968,15 +1132,7 @@ def show_comment_analysis_page():
         # ファイル名を変更したい場合の入力欄（オプション）
         # セッションステートにファイル名ベースが保存されていない場合のみ、デフォルト値を設定
         # 既に設定されている場合は上書きしない（Enterを押してもリセットされないようにする）
-        if st.session_state.csv_filename_base is None or st.session_state.csv_filename_base == "":
-            uploaded_filename_base = st.session_state.get("uploaded_csv_filename", "")
-            if uploaded_filename_base:
-                st.session_state.csv_filename_base = f"コメント分析_{uploaded_filename_base}"
-            else:
-                st.session_state.csv_filename_base = "コメント分析"
-        
-        # デフォルト値として現在のセッションステートの値を使用
-        current_filename_base = st.session_state.get("csv_filename_base", "コメント分析")
+        current_filename_base = ensure_csv_filename_base()
         
         file_title = st.text_input(
             "ファイル名を変更（拡張子なし、変更しない場合はそのまま）",
@@ -986,81 +1142,46 @@ def show_comment_analysis_page():
         
         # ユーザーが入力した値をセッションステートに保存（空でない場合のみ）
         if file_title and file_title.strip():
-            # 値が変更された場合、または初回設定の場合に更新
-            if file_title != current_filename_base or st.session_state.csv_filename_base != file_title:
-                st.session_state.csv_filename_base = file_title.strip()
+            st.session_state.csv_filename_base = file_title.strip()
         
-        # ファイル名が変更された場合は、CSVファイルを再生成
-        if file_title and file_title != st.session_state.get("csv_filename_base", ""):
-            try:
-                # 分析結果CSVを再生成
-                completed_csv = generate_completed_csv(df, stats)
-                st.session_state.csv_completed_data = completed_csv.encode('utf-8-sig')
-                st.session_state.csv_completed_filename = f"{file_title}_分析結果.csv"
-            except Exception as e:
-                st.error(f"CSVファイル生成エラー: {str(e)}")
+        # ファイル名のみ更新（CSVの内容はファイル名に依存しないため再生成しない）
+        st.session_state.csv_completed_filename = f"{st.session_state.csv_filename_base}_分析結果.csv"
         
-        # 分析結果CSVダウンロードリンク
-        if "csv_completed_data" in st.session_state and st.session_state.csv_completed_data:
-            download_link = create_download_link(
-                st.session_state.csv_completed_data,
+        # 分析結果CSVダウンロードボタン（CSVのバイト列はキャッシュから取得）
+        try:
+            render_download_button(
+                "分析結果CSV",
+                build_completed_csv_bytes(data_key, df, stats),
                 st.session_state.csv_completed_filename,
-                "text/csv"
+                "text/csv",
+                key="download_completed_csv"
             )
-            st.markdown(f"**分析結果CSV**: {download_link}", unsafe_allow_html=True)
-        else:
-            # 分析結果CSVがまだ生成されていない場合、生成を試みる
-            st.info("💡 分析結果CSVファイルを生成中...")
-            try:
-                completed_csv = generate_completed_csv(df, stats)
-                st.session_state.csv_completed_data = completed_csv.encode('utf-8-sig')
-                uploaded_filename_base = st.session_state.get("uploaded_csv_filename", "")
-                if uploaded_filename_base:
-                    default_file_title = f"コメント分析_{uploaded_filename_base}"
-                else:
-                    default_file_title = "コメント分析"
-                # セッションステートのファイル名ベースを使用（なければデフォルト値）
-                filename_base = st.session_state.get("csv_filename_base")
-                if not filename_base:  # Noneまたは空文字列の場合
-                    filename_base = default_file_title
-                    st.session_state.csv_filename_base = default_file_title
-                st.session_state.csv_completed_filename = f"{filename_base}_分析結果.csv"
-                download_link = create_download_link(
-                    st.session_state.csv_completed_data,
-                    st.session_state.csv_completed_filename,
-                    "text/csv"
-                )
-                st.markdown(f"**分析結果CSV**: {download_link}", unsafe_allow_html=True)
-            except Exception as e:
-                st.warning(f"分析結果CSVファイル生成エラー: {str(e)}")
+        except Exception as e:
+            st.warning(f"分析結果CSVファイル生成エラー: {str(e)}")
         
         # 質問コメントCSVダウンロードリンク
         if "question_csv_data" in st.session_state and st.session_state.question_csv_data:
-            question_download_link = create_download_link(
+            render_download_button(
+                "質問コメントCSV",
                 st.session_state.question_csv_data,
                 st.session_state.question_csv_filename,
-                "text/csv"
+                "text/csv",
+                key="download_question_csv"
             )
-            st.markdown(f"**質問コメントCSV**: {question_download_link}", unsafe_allow_html=True)
         else:
             # 質問コメントCSVがまだ生成されていない場合、生成を試みる
             if question_df is not None and len(question_df) > 0:
                 st.info("💡 質問コメントCSVファイルを生成中...")
                 try:
-                    question_csv = generate_question_csv(question_df)
-                    st.session_state.question_csv_data = question_csv.encode('utf-8-sig')
-                    uploaded_filename_base = st.session_state.get("uploaded_csv_filename", "")
-                    if uploaded_filename_base:
-                        question_filename = f"コメント分析_{uploaded_filename_base}_質問コメ.csv"
-                    else:
-                        question_filename = "コメント分析_質問コメ.csv"
-                    st.session_state.question_csv_filename = question_filename
-                    question_download_link = create_download_link(
+                    st.session_state.question_csv_data = generate_question_csv(question_df)
+                    st.session_state.question_csv_filename = f"{get_default_filename_base()}_質問コメ.csv"
+                    render_download_button(
+                        "質問コメントCSV",
                         st.session_state.question_csv_data,
                         st.session_state.question_csv_filename,
-                        "text/csv"
+                        "text/csv",
+                        key="download_question_csv"
                     )
-                    st.markdown(f"**質問コメントCSV**: {question_download_link}", unsafe_allow_html=True)
                 except Exception as e:
                     # エラーを可視化（デプロイ先でもエラーが見えるように）
                     error_msg = f"質問コメントCSVファイル生成エラー: {str(e)}"
@@ -18,24 +18,35 @@ except ImportError:
 
 # ローカルストレージのキー名
 API_KEY_STORAGE_KEY = "chat_analysis_openai_api_key"
+# LocalStorageインスタンスを保持するセッションステートのキー名
+LOCAL_STORAGE_SESSION_KEY = "_api_key_local_storage"
 _cached_api_key: Optional[str] = None
 
 
 def _get_local_storage():
-    """LocalStorageインスタンスを取得"""
-    if LOCAL_STORAGE_AVAILABLE:
-        return LocalStorage()
-    return None
-
-
-def _encode_key(api_key: str) -> str:
-    """APIキーをBase64エンコード（軽い難読化）"""
-    return base64.b64encode(api_key.encode()).decode()
-
+    """LocalStorageインスタンスを取得（ブラウザのセッションごとに1回だけ生成して再利用）"""
+    if not LOCAL_STORAGE_AVAILABLE:
+        return None
+    # 保存内容はブラウザごとに異なるため、モジュール全体ではなくセッションステートで保持する
+    local_storage = st.session_state.get(LOCAL_STORAGE_SESSION_KEY)
+    if local_storage is None:
+        local_storage = LocalStorage()
+        st.session_state[LOCAL_STORAGE_SESSION_KEY] = local_storage
+    return local_storage
+
+
+def _decode_legacy_key(stored_key: str) -> str:
+    """
+    以前のバージョンでBase64エンコードして保存されたAPIキーをデコード
 
-def _decode_key(encoded_key: str) -> str:
-    """Base64エンコードされたAPIキーをデコード"""
-    return base64.b64decode(encoded_key.encode()).decode()
+    現在はそのまま保存しているため、"sk-"で始まる値はそのまま返す
+    """
+    if stored_key.startswith("sk-"):
+        return stored_key
+    try:
+        return base64.b64decode(stored_key.encode()).decode()
+    except Exception:
+        return stored_key
 
 
 def _set_cached_api_key(api_key: str):
@@ -58,9 +69,7 @@ def save_api_key_to_storage(api_key: str) -> bool:
     local_storage = _get_local_storage()
     if local_storage:
         try:
-            encoded_key = _encode_key(api_key)
-            local_storage.setItem(API_KEY_STORAGE_KEY, encoded_key)
-            time.sleep(0.1)  # ストレージへの書き込み待機
+            local_storage.setItem(API_KEY_STORAGE_KEY, api_key)
             _set_cached_api_key(api_key)
             return True
         except Exception as e:
@@ -79,11 +88,11 @@ def load_api_key_from_storage() -> Optional[str]:
     local_storage = _get_local_storage()
     if local_storage:
         try:
-            encoded_key = local_storage.getItem(API_KEY_STORAGE_KEY)
-            if encoded_key:
-                decoded = _decode_key(encoded_key)
-                _set_cached_api_key(decoded)
-                return decoded
+            stored_key = local_storage.getItem(API_KEY_STORAGE_KEY)
+            if stored_key:
+                api_key = _decode_legacy_key(stored_key)
+                _set_cached_api_key(api_key)
+                return api_key
         except Exception:
             pass
     return None
@@ -266,17 +275,12 @@ def render_api_key_input() -> bool:
 def _render_api_key_form():
     """APIキー入力フォームをレンダリング"""
 
-    # 表示/非表示トグル（デフォルト: 表示）でChromeのパスワード候補を抑制
-    api_key_hidden = st.checkbox(
-        "入力を隠す（伏字）",
-        value=False,
-        key="api_key_hide_checkbox"
-    )
-    input_type = "password" if api_key_hidden else "default"
-
+    # 伏字入力（表示/非表示の切り替えは入力欄の目アイコンでブラウザ側のみで行われ、再実行は発生しない）
+    # autocomplete="new-password"で、Chromeが保存済みパスワードを候補表示・自動入力するのを抑制
     api_key_input = st.text_input(
         "OpenAI APIキー",
-        type=input_type,
+        type="password",
+        autocomplete="new-password",
         placeholder="sk-...",
         help="OpenAIのAPIキーを入力してください",
         key="api_key_input_field"
@@ -296,7 +300,7 @@ def _render_api_key_form():
             "**セキュリティに関する注意**\n\n"
             "APIキーはこのブラウザのローカルストレージに保存されます。\n"
             "- 共有PCでは使用しないでください\n"
-            "- キーは軽い難読化のみで保存されます"
+            "- キーは暗号化されずに保存されます"
         )
 
     # 設定ボタン
@@ -1,18 +1,246 @@
 """CSVデータ処理モジュール"""
+import csv
+import functools
+import numpy as np
 import pandas as pd
 import re
-from typing import List
-from config import OFFICIAL_GUEST_ID
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, List, Union
+from config import OFFICIAL_GUEST_ID, get_openai_api_key
+
+# PyArrowのインポート（マルチスレッドのCSVパーサーを使用するため）
+try:
+    import pyarrow
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 REQUIRED_COLUMNS = ["guest_id", "username", "original_text", "inserted_at"]
 
+# CSV読み込み時の列ごとの型（型推定を省略するため明示的に指定、ファイルに存在しない列は無視される）
+CSV_DTYPES = {
+    "guest_id": str,
+    "username": str,
+    "original_text": str,
+    "inserted_at": str,
+    "user_type": str,
+    "user_id": str,
+    "elapsed_time": "float64",
+}
+
+# elapsed_time形式のCSVから読み込む列（後続の処理で参照する列のみ）
+ELAPSED_TIME_COLUMNS = ["guest_id", "username", "original_text", "inserted_at", "elapsed_time", "user_type", "user_id"]
+
+# 同じ値が繰り返し現れるためカテゴリ型で保持する列
+CATEGORICAL_COLUMNS = ("user_type", "username", "guest_id")
+
+# ヘッダー行の検出時にファイル先頭から読み込むバイト数
+HEADER_SCAN_BYTES = 64 * 1024
+# ヘッダー行を検索する最大行数
+HEADER_SEARCH_ROWS = 10
+# PyArrowでCSVを分割して読み込む際の1ブロックのバイト数
+CSV_BLOCK_SIZE = 8 << 20
+# 欠損値として扱う文字列（pandas.read_csvの既定値と同じ）
+CSV_NULL_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+# AI判定で同時に問い合わせる最大数
+AI_QUESTION_MAX_WORKERS = 8
+
+# CSVの読み込み元（ファイルパスまたはアップロードされたファイルなどのバイナリファイルオブジェクト）
+CsvSource = Union[str, IO[bytes]]
+
+
+def _rewind(source: CsvSource) -> None:
+    """ファイルオブジェクトの場合は読み込み位置を先頭に戻す"""
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def _read_csv(source: CsvSource, **kwargs) -> pd.DataFrame:
+    """
+    CSVをpandasのCエンジンでDataFrameに読み込む
+    
+    PyArrowが利用できない場合や、PyArrowで解析できない場合に使用する
+    （pandasのPyArrowエンジンは型を推定してからdtypeに変換するため、
+    文字列として指定した列でも"00123"が"123"に書き換わる。そのためここでは使用しない）
+    
+    Args:
+        source: CSVファイルのパスまたはファイルオブジェクト
+        **kwargs: pd.read_csvに渡す引数
+    
+    Returns:
+        読み込んだデータフレーム
+    """
+    _rewind(source)
+    return pd.read_csv(source, **kwargs)
+
+
+def _arrow_column_types(columns: List[str], exclude: tuple = ()) -> dict:
+    """
+    CSV_DTYPESの型指定をPyArrowの列型に変換する
+    
+    PyArrowのCSVリーダーに列型を直接渡すことで、IDや本文の列は型推定を行わず
+    ファイル上の文字列のまま読み込まれる（"00123"や"1e3"が数値として解釈されない）
+    
+    Args:
+        columns: 読み込む列名のリスト
+        exclude: 型を指定せずPyArrowの推定に任せる列名
+    
+    Returns:
+        列名とPyArrowの型の辞書
+    """
+    arrow_types = {str: pyarrow.string(), "float64": pyarrow.float64()}
+    return {
+        col: arrow_types[CSV_DTYPES[col]]
+        for col in columns
+        if col in CSV_DTYPES and col not in exclude
+    }
+
+
+def _read_columns_in_batches(
+    source: CsvSource,
+    header_row: int,
+    columns: List[str],
+    column_types: dict,
+    dropna_subset: List[str],
+) -> pd.DataFrame:
+    """
+    PyArrowのストリーミングリーダーで指定した列のみをブロック単位で読み込む
+    
+    ブロックごとにDataFrameへ変換して空の行を削除してから結合するため、
+    ファイル全体を一度にDataFrame化する場合よりも最大メモリ使用量が小さくなる
+    
+    Args:
+        source: CSVファイルのパスまたはファイルオブジェクト
+        header_row: ヘッダー行のインデックス（0始まり）
+        columns: 読み込む列名のリスト（この順序で返す）
+        column_types: 列名とPyArrowの型の辞書（指定のない列は型を推定する）
+        dropna_subset: 値が空の場合に行を削除する列名のリスト
+    
+    Returns:
+        指定した列のみを含み、空の行を削除したデータフレーム
+    
+    Raises:
+        pyarrow.ArrowInvalid: PyArrowでCSVを解析・変換できない場合
+    """
+    _rewind(source)
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(skip_rows=header_row, block_size=CSV_BLOCK_SIZE),
+        # コメント本文は引用符で囲まれた改行を含む場合がある
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=columns,
+            column_types=column_types,
+            null_values=CSV_NULL_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    
+    chunks = [batch.to_pandas().dropna(subset=dropna_subset) for batch in reader]
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _read_head_lines(source: CsvSource, max_rows: int) -> List[str]:
+    """
+    CSVの先頭から最大max_rows行を読み込む
+    
+    先頭のHEADER_SCAN_BYTESバイトを1回で読み込み、まとめてデコードしてから行に分割する
+    
+    Args:
+        source: CSVファイルのパスまたはファイルオブジェクト
+        max_rows: 読み込む最大行数
+    
+    Returns:
+        読み込んだ行のリスト
+    """
+    if hasattr(source, "read"):
+        _rewind(source)
+        head = source.read(HEADER_SCAN_BYTES)
+        _rewind(source)
+    else:
+        with open(source, 'rb') as f:
+            head = f.read(HEADER_SCAN_BYTES)
+    
+    truncated = len(head) == HEADER_SCAN_BYTES
+    if isinstance(head, bytes):
+        head = head.decode('utf-8-sig', errors='replace')
+    
+    lines = head.split('\n')
+    # 読み込み範囲の末尾で途切れた行、または末尾の改行による空要素は除外
+    if truncated or not lines[-1]:
+        lines.pop()
+    return lines[:max_rows]
+
+
+def _read_header_columns(source: CsvSource, header_row: int) -> List[str]:
+    """
+    指定したヘッダー行の列名を取得
+    
+    Args:
+        source: CSVファイルのパスまたはファイルオブジェクト
+        header_row: ヘッダー行のインデックス（0始まり）
+    
+    Returns:
+        列名のリスト（行が存在しない場合は空リスト）
+    """
+    return _parse_header_line(_read_head_lines(source, header_row + 1), header_row)
+
+
+def _parse_header_line(lines: List[str], header_row: int) -> List[str]:
+    """
+    読み込み済みの先頭行から指定したヘッダー行の列名を取得
+    
+    Args:
+        lines: CSVの先頭行のリスト
+        header_row: ヘッダー行のインデックス（0始まり）
+    
+    Returns:
+        列名のリスト（行が存在しない場合は空リスト）
+    """
+    if len(lines) <= header_row:
+        return []
+    return next(csv.reader([lines[header_row]]), [])
+
+
+def _find_header_row(lines: List[str], required_columns: List[str]) -> int:
+    """
+    読み込み済みの先頭行から必要な列を含むヘッダー行を検出
+    
+    Args:
+        lines: CSVの先頭行のリスト
+        required_columns: 必要な列名のリスト
+    
+    Returns:
+        ヘッダー行のインデックス（0始まり、見つからない場合は0）
+    """
+    required = set(required_columns)
+    
+    # 先頭行をCSVとしてパースして、必要な列が含まれているかチェック
+    # （引用符で囲まれたカンマを含む列名も正しく分割される）
+    for row_idx, row in enumerate(csv.reader(lines)):
+        columns = {col.strip() for col in row}
+        
+        # 必要な列がすべて含まれているかチェック
+        if required.issubset(columns):
+            return row_idx
+    
+    # 見つからない場合は0行目（1行目）を返す
+    return 0
+
 
-def detect_header_row(file_path: str, required_columns: List[str], max_rows: int = 10) -> int:
+def detect_header_row(file_path: CsvSource, required_columns: List[str], max_rows: int = HEADER_SEARCH_ROWS) -> int:
     """
     必要な列を含むヘッダー行を検出
     
     Args:
-        file_path: CSVファイルのパス
+        file_path: CSVファイルのパスまたはファイルオブジェクト
         required_columns: 必要な列名のリスト
         max_rows: 検索する最大行数
     
@@ -20,32 +248,18 @@ def detect_header_row(file_path: str, required_columns: List[str], max_rows: int
         ヘッダー行のインデックス（0始まり、見つからない場合は0）
     """
     try:
-        # CSVファイルを1行ずつ読み込んで、必要な列が含まれているかチェック
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for row_idx, line in enumerate(f):
-                if row_idx >= max_rows:
-                    break
-                
-                # 行をカンマで分割して列名を取得
-                columns = [col.strip() for col in line.split(',')]
-                
-                # 必要な列がすべて含まれているかチェック
-                if all(col in columns for col in required_columns):
-                    return row_idx
-        
-        # 見つからない場合は0行目（1行目）を返す
-        return 0
+        return _find_header_row(_read_head_lines(file_path, max_rows), required_columns)
     except Exception:
         # エラーが発生した場合は0行目（1行目）を返す
         return 0
 
 
-def load_csv(file_path: str) -> pd.DataFrame:
+def load_csv(file_path: CsvSource) -> pd.DataFrame:
     """
     CSVファイルを読み込む（ヘッダー行を自動検出）
     
     Args:
-        file_path: CSVファイルのパス
+        file_path: CSVファイルのパスまたはファイルオブジェクト
         
     Returns:
         読み込んだデータフレーム
@@ -53,19 +267,41 @@ def load_csv(file_path: str) -> pd.DataFrame:
     Raises:
         ValueError: 必要な列が存在しない場合
     """
-    # 必要な列を含むヘッダー行を自動検出
-    header_row = detect_header_row(file_path, REQUIRED_COLUMNS)
+    # ファイルの先頭を1回だけ読み込み、ヘッダー行の検出と列名の取得の両方に使う
+    head_lines = _read_head_lines(file_path, HEADER_SEARCH_ROWS)
     
-    # 検出したヘッダー行を使用してCSVファイルを読み込む
-    df = pd.read_csv(file_path, header=header_row)
+    # 必要な列を含むヘッダー行を自動検出
+    header_row = _find_header_row(head_lines, REQUIRED_COLUMNS)
     
-    # 必要な列の存在確認
-    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    # 必要な列の存在確認（ヘッダー行のみで判定）
+    header_columns = _parse_header_line(head_lines, header_row)
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in header_columns]
     if missing_columns:
         raise ValueError(f"必要な列が見つかりません: {', '.join(missing_columns)}")
     
-    # 必要な列のみ抽出
-    df = df[REQUIRED_COLUMNS].copy()
+    # PyArrowが利用可能な場合は、必要な列のみをブロック単位で読み込んで空の行を削除
+    # （ブロック間で日時の形式が異なる場合などは、ファイル全体を一度に読み込む処理にフォールバック）
+    # （inserted_atは型を指定せず、日時として解析させる）
+    if PYARROW_AVAILABLE:
+        try:
+            return _read_columns_in_batches(
+                file_path,
+                header_row,
+                REQUIRED_COLUMNS,
+                _arrow_column_types(REQUIRED_COLUMNS, exclude=("inserted_at",)),
+                ["original_text", "inserted_at"],
+            )
+        except pyarrow.ArrowInvalid:
+            pass
+    
+    # 検出したヘッダー行を使用し、必要な列のみを読み込む（不要な列はメモリに載せない）
+    # inserted_atは文字列として型指定せず、読み込み時に日時として解析する（解析できない場合は文字列のまま）
+    dtype = {col: col_dtype for col, col_dtype in CSV_DTYPES.items() if col != "inserted_at"}
+    df = _read_csv(file_path, header=header_row, usecols=REQUIRED_COLUMNS, dtype=dtype, parse_dates=["inserted_at"])
+    
+    # 列の順序をREQUIRED_COLUMNSに揃える（usecolsはファイル内の順序で返すため）
+    if list(df.columns) != REQUIRED_COLUMNS:
+        df = df[REQUIRED_COLUMNS]
     
     # 空の行を削除
     df = df.dropna(subset=["original_text", "inserted_at"])
@@ -89,24 +325,59 @@ def validate_and_process_data(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         raise ValueError("データが空です。")
     
-    # inserted_atをdatetime型に変換
-    df["inserted_at"] = pd.to_datetime(df["inserted_at"], errors="coerce")
+    # inserted_atをdatetime型に変換（ISO 8601形式として一括変換し、タイムゾーンはUTCに揃える）
+    inserted_at = pd.to_datetime(df["inserted_at"], format="ISO8601", errors="coerce", utc=True, cache=True)
     
-    # 変換に失敗した行を削除
-    df = df.dropna(subset=["inserted_at"])
+    # ISO 8601形式で解釈できなかった値のみ、形式を推定して変換
+    unparsed = inserted_at.isna() & df["inserted_at"].notna()
+    if unparsed.any():
+        inserted_at[unparsed] = pd.to_datetime(df["inserted_at"][unparsed], errors="coerce", utc=True)
     
-    if df.empty:
+    # 変換に失敗した行を除外する有効行マスク
+    valid = inserted_at.notna().to_numpy()
+    
+    if not valid.any():
         raise ValueError("有効な日時データがありません。")
     
-    # inserted_atでソート（早い順）
-    df = df.sort_values("inserted_at").reset_index(drop=True)
+    # 有効行のみをinserted_atで安定ソート（早い順）し、1回の抽出でデータフレームを作成
+    valid_positions = np.flatnonzero(valid)
+    # 日時の内部表現（int64）をコピーせずに参照してソートキーにする（単位の変換も行わない）
+    sort_keys = inserted_at.values.view("i8")[valid_positions]
+    order = np.argsort(sort_keys, kind="stable")
+    positions = valid_positions[order]
+    
+    df = df.take(positions)
+    df.index = pd.RangeIndex(len(df))
+    df["inserted_at"] = inserted_at.take(positions).set_axis(df.index)
     
     # 相対時間に変換（最初のコメントを00:00:00に）
     df = convert_to_relative_time(df)
     
+    # 繰り返しの多い列はカテゴリ型に変換
+    return categorize_columns(df)
+
+
+def categorize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    値の種類が少ない列（user_type, username, guest_id）をカテゴリ型に変換する
+    
+    Args:
+        df: データフレーム
+        
+    Returns:
+        対象列をカテゴリ型に変換したデータフレーム（カテゴリは出現順に並べる）
+    """
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(pd.CategoricalDtype(df[col].dropna().unique()))
+    
     return df
 
 
+# 配信時間（HH:MM形式）の文字列テーブル（経過分数をインデックスとする、0:00〜47:59）
+_HHMM_TABLE = [f"{h:02d}:{m:02d}" for h in range(48) for m in range(60)]
+
+
 def format_time_from_seconds(seconds: float) -> str:
     """
     秒数から配信時間（HH:MM形式）を生成
@@ -118,11 +389,49 @@ def format_time_from_seconds(seconds: float) -> str:
         配信時間文字列（HH:MM形式）
     """
     total_seconds = int(seconds)
+    
+    # 範囲内の場合は事前に生成した文字列を返す（範囲外は文字列を組み立てる）
+    total_minutes = total_seconds // 60
+    if 0 <= total_seconds and total_minutes < len(_HHMM_TABLE):
+        return _HHMM_TABLE[total_minutes]
+    
     hours = total_seconds // 3600
     minutes = (total_seconds % 3600) // 60
     return f"{hours:02d}:{minutes:02d}"
 
 
+def format_seconds_series(seconds: pd.Series) -> pd.Series:
+    """
+    秒数のSeriesを配信時間（HH:MM形式）の文字列Seriesに一括変換
+    
+    format_time_from_seconds を列単位で適用するのと同じ結果を、
+    行ごとのPython関数呼び出しなしで得る
+    
+    Args:
+        seconds: 経過秒数のSeries
+        
+    Returns:
+        配信時間文字列（HH:MM形式）のSeries
+    """
+    total_seconds = seconds.astype("int64")
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    
+    # 時間が2桁に収まる場合は、HH:MMの5バイトを数値演算で直接組み立てる
+    if len(total_seconds) > 0 and hours.min() >= 0 and hours.max() < 100:
+        h = hours.to_numpy()
+        m = minutes.to_numpy()
+        out = np.empty((len(h), 5), dtype=np.uint8)
+        out[:, 0] = ord("0") + h // 10
+        out[:, 1] = ord("0") + h % 10
+        out[:, 2] = ord(":")
+        out[:, 3] = ord("0") + m // 10
+        out[:, 4] = ord("0") + m % 10
+        return pd.Series(out.view("S5").ravel().astype("U5"), index=seconds.index)
+    
+    return hours.astype(str).str.zfill(2) + ":" + minutes.astype(str).str.zfill(2)
+
+
 def convert_elapsed_time_to_broadcast_time(df: pd.DataFrame) -> pd.DataFrame:
     """
     elapsed_timeカラムを配信時間（HH:MM形式）に変換
@@ -149,10 +458,8 @@ def convert_elapsed_time_to_broadcast_time(df: pd.DataFrame) -> pd.DataFrame:
     # 最小値を00:00に設定（最初のコメントを00:00にする）
     min_elapsed = df['elapsed_time'].min()
     
-    # elapsed_timeを配信時間（HH:MM形式）に変換
-    df['配信時間'] = df['elapsed_time'].apply(
-        lambda x: format_time_from_seconds(x - min_elapsed)
-    )
+    # elapsed_timeを配信時間（HH:MM形式）に一括変換
+    df['配信時間'] = format_seconds_series(df['elapsed_time'] - min_elapsed)
     
     return df
 
@@ -170,30 +477,27 @@ def convert_to_relative_time(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
     
-    # 最初のコメントの時刻を取得
-    first_time = df["inserted_at"].iloc[0]
+    # 日時の内部表現（int64）をコピーせずに参照（タイムゾーン付きの場合はUTC）
+    values = df["inserted_at"].values
+    ticks = values.view("i8")
+    unit, count = np.datetime_data(values.dtype)
+    ticks_per_second = np.timedelta64(1, "s") // np.timedelta64(count, unit)
     
-    # 各コメントの経過時間を計算
-    time_deltas = df["inserted_at"] - first_time
+    # 各コメントの最初のコメントからの経過時間（秒）をint64のまま計算
+    elapsed_seconds = pd.Series((ticks - ticks[0]) // ticks_per_second, index=df.index)
     
-    # 時:分形式に変換（HH:MM）
-    def format_time_delta(td: pd.Timedelta) -> str:
-        total_seconds = int(td.total_seconds())
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        return f"{hours:02d}:{minutes:02d}"
-    
-    df["inserted_at"] = time_deltas.apply(format_time_delta)
+    # 時:分形式に一括変換（HH:MM）
+    df["inserted_at"] = format_seconds_series(elapsed_seconds)
     
     return df
 
 
-def load_csv_with_elapsed_time(file_path: str) -> pd.DataFrame:
+def load_csv_with_elapsed_time(file_path: CsvSource) -> pd.DataFrame:
     """
     elapsed_timeカラムを含むCSVファイルを読み込む
     
     Args:
-        file_path: CSVファイルのパス
+        file_path: CSVファイルのパスまたはファイルオブジェクト
         
     Returns:
         読み込んだデータフレーム（配信時間カラムが追加される）
@@ -201,26 +505,88 @@ def load_csv_with_elapsed_time(file_path: str) -> pd.DataFrame:
     Raises:
         ValueError: 必要な列が存在しない場合
     """
-    # CSVファイルを読み込む（すべての列を読み込む）
-    df = pd.read_csv(file_path, encoding='utf-8-sig')
+    header_columns = _read_header_columns(file_path, 0)
     
-    # 必要な列の存在確認
+    # 必要な列の存在確認（ヘッダー行のみで判定）
     required_columns_for_elapsed = ["username", "original_text"]
-    missing_columns = [col for col in required_columns_for_elapsed if col not in df.columns]
+    missing_columns = [col for col in required_columns_for_elapsed if col not in header_columns]
     if missing_columns:
         raise ValueError(f"必要な列が見つかりません: {', '.join(missing_columns)}")
     
     # elapsed_timeカラムが存在しない場合のエラーチェック
-    if 'elapsed_time' not in df.columns:
+    if 'elapsed_time' not in header_columns:
         raise ValueError("elapsed_timeカラムが見つかりません。")
     
-    # 空の行を削除
-    df = df.dropna(subset=["original_text", "elapsed_time"])
+    # 後続の処理で参照する列のうち、ファイルに存在する列のみを読み込む（不要な列はメモリに載せない）
+    usecols = [col for col in header_columns if col in ELAPSED_TIME_COLUMNS]
+    
+    # PyArrowが利用可能な場合は、列型を指定してブロック単位で読み込んで空の行を削除
+    # （inserted_atはエクスポート用にファイル上の文字列のまま保持する）
+    df = None
+    if PYARROW_AVAILABLE:
+        try:
+            df = _read_columns_in_batches(
+                file_path, 0, usecols, _arrow_column_types(usecols), ["original_text", "elapsed_time"]
+            )
+        except pyarrow.ArrowInvalid:
+            pass
+    
+    if df is None:
+        df = _read_csv(file_path, encoding='utf-8-sig', usecols=usecols, dtype=CSV_DTYPES)
+        # 空の行を削除
+        df = df.dropna(subset=["original_text", "elapsed_time"])
     
     # elapsed_timeを配信時間に変換
     df = convert_elapsed_time_to_broadcast_time(df)
     
-    return df
+    # 繰り返しの多い列はカテゴリ型に変換
+    return categorize_columns(df)
+
+
+# 情報提供パターン（質問ではない）
+# 「〜となります！」「〜でございます！」「〜です！」「〜ます！」で終わる情報提供文
+INFORMATION_PROVIDING_PATTERNS = [
+    r'となります！$', r'となります。$', r'となります$',
+    r'でございます！$', r'でございます。$', r'でございます$',
+    r'です！$', r'です。$', r'ます！$', r'ます。$',
+    r'となります\?$', r'となります？$',
+    r'でございます\?$', r'でございます？$'
+]
+
+# 疑問詞パターン
+QUESTION_WORDS = [
+    r'何', r'いくら', r'どこ', r'いつ', r'どう', r'なぜ', r'どれ', r'どの', r'誰', r'どちら',
+    r'なに', r'いくつ', r'どなた', r'どのくらい', r'どの程度', r'どれくらい',
+    r'どんな', r'どのような', r'どういう', r'どうやって', r'なぜ', r'なんで'
+]
+
+# 疑問符パターン
+QUESTION_MARK_PATTERN = r'[？?]'
+
+# 質問パターン（文末）
+QUESTION_END_PATTERNS = [
+    r'ですか', r'ますか', r'なんですか', r'なんか', r'でしょうか', r'でしょうか',
+    r'ですか？', r'ますか？', r'なんですか？', r'でしょうか？',
+    r'ですか\?', r'ますか\?', r'なんですか\?', r'でしょうか\?',
+    r'か？', r'か\?', r'か。', r'か！'
+]
+
+# 否定疑問パターン
+NEGATIVE_QUESTION_PATTERNS = [
+    r'ないですか', r'ませんか', r'ないですか？', r'ませんか？',
+    r'ないですか\?', r'ませんか\?', r'ない？', r'ない\?'
+]
+
+# 各パターンを1つの正規表現にまとめてコンパイル（判定ごとの再コンパイルとループを避ける）
+_INFORMATION_PROVIDING_RE = re.compile('|'.join(INFORMATION_PROVIDING_PATTERNS))
+_QUESTION_WORD_RE = re.compile('|'.join(QUESTION_WORDS), re.IGNORECASE)
+_QUESTION_MARK_RE = re.compile(QUESTION_MARK_PATTERN)
+_QUESTION_END_RE = re.compile('|'.join(QUESTION_END_PATTERNS + NEGATIVE_QUESTION_PATTERNS))
+
+# 質問と判定されうるコメントに必ず含まれる文字（疑問詞の先頭文字、疑問符、質問パターン（文末）に共通する「か」）
+# いずれも含まないコメントは正規表現を適用せずに質問ではないと判定できる
+_QUESTION_MARKERS = frozenset(word[0] for word in QUESTION_WORDS) | frozenset("？?か")
+_QUESTION_MARKER_RE = re.compile('[' + ''.join(re.escape(ch) for ch in sorted(_QUESTION_MARKERS)) + ']')
 
 
 def is_question_by_pattern(comment_text: str) -> bool:
@@ -240,73 +606,75 @@ def is_question_by_pattern(comment_text: str) -> bool:
     if not comment_text:
         return False
     
+    return _match_question_patterns(comment_text)
+
+
+@functools.lru_cache(maxsize=65536)
+def _match_question_patterns(comment_text: str) -> bool:
+    """
+    前後の空白を除去したコメント本文に質問パターンを適用（同じコメントは判定結果を再利用）
+    
+    Args:
+        comment_text: 前後の空白を除去したコメント本文
+        
+    Returns:
+        True（質問）またはFalse（質問ではない）
+    """
+    # 質問の手がかりとなる文字を1つも含まない場合は正規表現を適用せずに判定
+    if _QUESTION_MARKERS.isdisjoint(comment_text):
+        return False
+    
     # 情報提供パターンを除外（質問ではない）
-    # 「〜となります！」「〜でございます！」「〜です！」「〜ます！」で終わる情報提供文
-    information_providing_patterns = [
-        r'となります！$', r'となります。$', r'となります$',
-        r'でございます！$', r'でございます。$', r'でございます$',
-        r'です！$', r'です。$', r'ます！$', r'ます。$',
-        r'となります\?$', r'となります\？$',
-        r'でございます\?$', r'でございます\？$'
-    ]
-    
-    # 情報提供パターンチェック（先に除外）
-    for pattern in information_providing_patterns:
-        if re.search(pattern, comment_text):
-            return False
-    
-    # 疑問詞パターン
-    question_words = [
-        r'何', r'いくら', r'どこ', r'いつ', r'どう', r'なぜ', r'どれ', r'どの', r'誰', r'どちら',
-        r'なに', r'いくつ', r'どなた', r'どのくらい', r'どの程度', r'どれくらい',
-        r'どんな', r'どのような', r'どういう', r'どうやって', r'なぜ', r'なんで'
-    ]
-    
-    # 疑問符パターン
-    question_mark_pattern = r'[？?]'
-    
-    # 質問パターン（文末）
-    question_end_patterns = [
-        r'ですか', r'ますか', r'なんですか', r'なんか', r'でしょうか', r'でしょうか',
-        r'ですか？', r'ますか？', r'なんですか？', r'でしょうか？',
-        r'ですか\?', r'ますか\?', r'なんですか\?', r'でしょうか\?',
-        r'か？', r'か\?', r'か。', r'か！'
-    ]
-    
-    # 否定疑問パターン
-    negative_question_patterns = [
-        r'ないですか', r'ませんか', r'ないですか？', r'ませんか？',
-        r'ないですか\?', r'ませんか\?', r'ない？', r'ない\?'
-    ]
-    
-    # 疑問詞チェック
-    for word in question_words:
-        if re.search(word, comment_text, re.IGNORECASE):
-            return True
-    
-    # 疑問符チェック
-    if re.search(question_mark_pattern, comment_text):
-        return True
-    
-    # 質問パターンチェック（文末）
-    for pattern in question_end_patterns:
-        if re.search(pattern, comment_text):
-            return True
-    
-    # 否定疑問パターンチェック
-    for pattern in negative_question_patterns:
-        if re.search(pattern, comment_text):
-            return True
-    
-    return False
-
-
-def is_question_by_ai(comment_text: str) -> bool:
+    if _INFORMATION_PROVIDING_RE.search(comment_text):
+        return False
+    
+    # 疑問詞・疑問符・質問パターン（文末）・否定疑問パターンのいずれかを含めば質問
+    return bool(
+        _QUESTION_WORD_RE.search(comment_text)
+        or _QUESTION_MARK_RE.search(comment_text)
+        or _QUESTION_END_RE.search(comment_text)
+    )
+
+
+def is_question_by_pattern_series(texts: pd.Series) -> pd.Series:
+    """
+    パターンマッチングで質問かどうかを列単位で一括判定
+    
+    is_question_by_pattern を各行に適用するのと同じ結果を、行ごとのPython関数呼び出しなしで得る
+    
+    Args:
+        texts: コメント本文のSeries
+        
+    Returns:
+        質問の行がTrueのブールSeries（文字列でない値・空文字列はFalse）
+    """
+    # 重複するコメントは1回だけ判定する（欠損値のコードは-1）
+    codes, uniques = pd.factorize(texts.astype("string").str.strip())
+    stripped = pd.Series(uniques, dtype="string")
+    
+    # 質問の手がかりとなる文字を含むコメントのみを候補として、以降の正規表現を適用
+    is_question = stripped.str.contains(_QUESTION_MARKER_RE, regex=True, na=False).to_numpy(dtype=bool)
+    candidates = stripped[is_question]
+    
+    def contains(pattern: re.Pattern) -> np.ndarray:
+        return candidates.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+    
+    # 情報提供パターンを除外し、疑問詞・疑問符・質問パターン（文末）のいずれかを含む行を質問とする
+    is_question[is_question] = (
+        (contains(_QUESTION_WORD_RE) | contains(_QUESTION_MARK_RE) | contains(_QUESTION_END_RE))
+        & ~contains(_INFORMATION_PROVIDING_RE)
+    )
+    # 末尾に欠損値（コード-1）用のFalseを追加して各行に展開
+    return pd.Series(np.append(is_question, False)[codes], index=texts.index)
+
+
+def is_question_by_ai(comment_text: str, client=None) -> bool:
     """
     AI判定で質問かどうかを判定
     
     Args:
         comment_text: コメント本文
+        client: OpenAIクライアント（省略時は現在のAPIキーから取得）
         
     Returns:
         True（質問）またはFalse（質問ではない）
@@ -318,35 +686,14 @@ def is_question_by_ai(comment_text: str) -> bool:
     if not comment_text:
         return False
     
-    try:
-        from prompts.analysis_prompts import is_question_prompt
-        from utils.ai_analyzer import get_openai_client
-        
-        prompt = is_question_prompt(comment_text)
-        client = get_openai_client()
-        
-        if not client:
+    if client is None:
+        client = _resolve_question_client()
+        if client is None:
             # APIキーが設定されていない場合は簡易判定の結果を返す
             return is_question_by_pattern(comment_text)
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            max_completion_tokens=10,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1
-        )
-        
-        raw_response = response.choices[0].message.content.strip()
-        
-        # 「はい」または「yes」を含む場合は質問
-        if "はい" in raw_response or "yes" in raw_response.lower():
-            return True
-        
-        # それ以外は質問ではない
-        return False
-        
+    
+    try:
+        return _classify_question_by_ai(client, comment_text)
     except Exception as e:
         # エラーが発生した場合は簡易判定の結果を返す
         import sys
@@ -354,6 +701,152 @@ def is_question_by_ai(comment_text: str) -> bool:
         return is_question_by_pattern(comment_text)
 
 
+def _resolve_question_client():
+    """
+    現在のAPIキーに対応するOpenAIクライアントを取得
+    
+    APIキーの取得でセッションステートを参照するため、Streamlitのスクリプトのスレッドで呼び出す
+    
+    Returns:
+        OpenAIクライアント、APIキーがなければNone
+    """
+    api_key = get_openai_api_key()
+    if not api_key:
+        return None
+    return _openai_client_for(api_key)
+
+
+@functools.lru_cache(maxsize=4)
+def _openai_client_for(api_key: str):
+    """APIキーごとにOpenAIクライアントを1つだけ生成して再利用（クライアントはスレッド間で共有できる）"""
+    import openai
+    return openai.OpenAI(api_key=api_key)
+
+
+@functools.lru_cache(maxsize=8192)
+def _classify_question_by_ai(client, comment_text: str) -> bool:
+    """
+    OpenAI APIに質問かどうかを問い合わせる（同じクライアント・同じコメントは再度問い合わせない）
+    
+    クライアントはAPIキーごとに1つのため、判定結果はAPIキーごとにキャッシュされる。
+    エラー時は例外を送出するため、失敗した結果はキャッシュされない
+    
+    Args:
+        client: OpenAIクライアント
+        comment_text: 前後の空白を除去したコメント本文
+        
+    Returns:
+        True（質問）またはFalse（質問ではない）
+    """
+    from prompts.analysis_prompts import is_question_prompt
+    
+    prompt = is_question_prompt(comment_text)
+    
+    response = client.chat.completions.create(
+        model="gpt-4o-mini",
+        max_completion_tokens=10,
+        messages=[
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.1
+    )
+    
+    raw_response = response.choices[0].message.content.strip()
+    
+    # 「はい」または「yes」を含む場合は質問、それ以外は質問ではない
+    return "はい" in raw_response or "yes" in raw_response.lower()
+
+
+def is_question_by_ai_series(texts: pd.Series) -> pd.Series:
+    """
+    AI判定で質問かどうかを列単位で判定（APIへの問い合わせを並列実行）
+    
+    Args:
+        texts: コメント本文のSeries
+        
+    Returns:
+        質問の行がTrueのブールSeries
+    """
+    # クライアントは呼び出し元のスレッドで1回だけ取得し、各スレッドに渡す
+    client = _resolve_question_client()
+    if client is None:
+        # APIキーが設定されていない場合は簡易判定の結果を返す
+        return is_question_by_pattern_series(texts)
+    
+    # 同じコメントは1回だけ問い合わせる
+    unique_texts = pd.unique(texts.to_numpy(dtype=object))
+    with ThreadPoolExecutor(max_workers=AI_QUESTION_MAX_WORKERS) as executor:
+        results = dict(zip(unique_texts, executor.map(lambda text: is_question_by_ai(text, client), unique_texts)))
+    return pd.Series([results[text] for text in texts.to_numpy(dtype=object)], index=texts.index, dtype=bool)
+
+
+def _keep_mask(column: pd.Series, predicate) -> np.ndarray:
+    """
+    列の値ごとに残すかどうかを判定したマスクを作成
+    
+    カテゴリ型の列はカテゴリごとに1回だけ判定し、カテゴリコードで各行に展開する。
+    
+    Args:
+        column: 判定対象の列
+        predicate: 文字列型のSeriesを受け取り、残す値がTrueのSeriesを返す関数
+        
+    Returns:
+        残す行がTrueのブール配列（欠損値の行はTrue）
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        categories = pd.Series(column.cat.categories).astype("string")
+        # 末尾に欠損値（コード-1）用のTrueを追加
+        keep_by_code = np.append(predicate(categories).fillna(True).to_numpy(dtype=bool), True)
+        return keep_by_code[column.cat.codes.to_numpy()]
+    return predicate(column.astype("string")).fillna(True).to_numpy(dtype=bool)
+
+
+# 公式コメントの判定ルール（列名と、文字列型のSeriesを受け取り残す値がTrueのSeriesを返す関数の組）
+_OFFICIAL_COMMENT_RULES = (
+    # 1. user_typeが"moderator"の行を除外
+    ("user_type", lambda s: s.str.strip().str.lower().ne('moderator')),
+    # 2. user_idが存在し、値が空でない行を除外（user_idがNaN/Noneまたは空文字列の行のみ残す）
+    ("user_id", lambda s: s.isna() | s.str.strip().eq('')),
+    # 後方互換性のため、guest_idによる判定も残す（将来的に削除予定）
+    ("guest_id", lambda s: s.str.strip().ne(OFFICIAL_GUEST_ID)),
+    # usernameが"マツキヨココカラSTAFF"の行を除外
+    ("username", lambda s: s.str.strip().ne('マツキヨココカラSTAFF')),
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _official_comment_rules_for(columns: frozenset) -> tuple:
+    """
+    列構成に対して適用する公式コメントの判定ルールを取得（列構成ごとに結果を再利用）
+    
+    Args:
+        columns: データフレームの列名の集合
+        
+    Returns:
+        存在する列に対応する判定ルールのタプル
+    """
+    return tuple(rule for rule in _OFFICIAL_COMMENT_RULES if rule[0] in columns)
+
+
+def official_comment_exclusion_mask(df: pd.DataFrame) -> pd.Series:
+    """
+    公式コメントを除外するためのマスクを作成
+    
+    Args:
+        df: データフレーム
+        
+    Returns:
+        残す行がTrueのブールSeries（公式コメントの行がFalse）
+    """
+    # インデックスの整列を伴わないよう、NumPy配列上でマスクを結合する
+    keep = np.ones(len(df), dtype=bool)
+    
+    for column, predicate in _official_comment_rules_for(frozenset(df.columns)):
+        keep &= _keep_mask(df[column], predicate)
+    
+    return pd.Series(keep, index=df.index)
+
+
 def extract_questions(df: pd.DataFrame, attribute_column: str = "チャットの属性") -> pd.DataFrame:
     """
     質問コメントを抽出（公式コメントは除外）
@@ -368,54 +861,46 @@ def extract_questions(df: pd.DataFrame, attribute_column: str = "チャットの
     if df.empty:
         return df.copy()
     
-    # 「商品への質問」はそのまま抽出
-    product_questions = df[df[attribute_column] == "商品への質問"].copy()
+    # 属性列を1回の走査で整数コードに変換し、属性ごとの抽出はコードの比較で行う
+    # （カテゴリ型の場合は既存のカテゴリコードをそのまま使用）
+    attribute = df[attribute_column]
+    if isinstance(attribute.dtype, pd.CategoricalDtype):
+        codes, categories = attribute.cat.codes.to_numpy(), attribute.cat.categories
+    else:
+        codes, categories = pd.factorize(attribute)
+    product_code, performer_code = pd.Index(categories).get_indexer(["商品への質問", "出演者関連"])
+    
+    # 「商品への質問」はそのまま抽出（属性が存在しない場合のコード-1は欠損値と区別する）
+    product_mask = (codes == product_code) if product_code >= 0 else np.zeros(len(df), dtype=bool)
     
     # 「出演者関連」は質問判定を実施
-    performer_comments = df[df[attribute_column] == "出演者関連"].copy()
-    performer_questions = pd.DataFrame()
+    performer_mask = (codes == performer_code) if performer_code >= 0 else np.zeros(len(df), dtype=bool)
+    pattern_mask = np.zeros(len(df), dtype=bool)
+    ai_mask = np.zeros(len(df), dtype=bool)
     
-    if not performer_comments.empty:
+    if performer_mask.any() and 'original_text' in df.columns:
+        performer_texts = df['original_text'][performer_mask]
         # 簡易判定を実行
-        if 'original_text' in performer_comments.columns:
-            question_mask = performer_comments['original_text'].apply(is_question_by_pattern)
-            performer_questions = performer_comments[question_mask].copy()
-            
-            # 不明確なケース（簡易判定でFalseだが疑問符がある場合など）はAI判定
-            uncertain_mask = ~question_mask & performer_comments['original_text'].str.contains(r'[？?]', na=False, regex=True)
-            if uncertain_mask.any():
-                uncertain_comments = performer_comments[uncertain_mask].copy()
-                # AI判定を実行
-                ai_question_mask = uncertain_comments['original_text'].apply(is_question_by_ai)
-                ai_questions = uncertain_comments[ai_question_mask].copy()
-                if not ai_questions.empty:
-                    performer_questions = pd.concat([performer_questions, ai_questions], ignore_index=True)
-    
-    # 質問コメントを結合
-    question_df = pd.concat([product_questions, performer_questions], ignore_index=True)
-    
-    if question_df.empty:
-        return question_df
-    
-    # 公式コメントを除外
-    # 1. user_typeが"moderator"の行を除外
-    if 'user_type' in question_df.columns:
-        question_df = question_df[question_df['user_type'].astype(str).str.strip().str.lower() != 'moderator'].copy()
-    
-    # 2. user_idが存在し、値が空でない行を除外
-    if 'user_id' in question_df.columns:
-        # user_idがNaN/Noneでなく、空文字列でない行を除外
-        mask = question_df['user_id'].isna() | (question_df['user_id'].astype(str).str.strip() == '')
-        question_df = question_df[mask].copy()
-    
-    # 後方互換性のため、guest_idによる判定も残す（将来的に削除予定）
-    if 'guest_id' in question_df.columns:
-        question_df = question_df[question_df['guest_id'].astype(str).str.strip() != OFFICIAL_GUEST_ID].copy()
-    
-    # usernameが"マツキヨココカラSTAFF"の行を除外
-    if 'username' in question_df.columns:
-        question_df = question_df[question_df['username'].astype(str).str.strip() != 'マツキヨココカラSTAFF'].copy()
-    
-    return question_df.reset_index(drop=True)
+        question_mask = is_question_by_pattern_series(performer_texts).to_numpy(dtype=bool)
+        pattern_mask[performer_mask] = question_mask
+        
+        # 不明確なケース（簡易判定でFalseだが疑問符がある場合など）はAI判定
+        uncertain_mask = ~question_mask & performer_texts.str.contains(r'[？?]', na=False, regex=True).to_numpy(dtype=bool)
+        if uncertain_mask.any():
+            # AI判定を実行
+            uncertain_positions = np.flatnonzero(performer_mask)[uncertain_mask]
+            ai_question_mask = is_question_by_ai_series(performer_texts[uncertain_mask]).to_numpy(dtype=bool)
+            ai_mask[uncertain_positions[ai_question_mask]] = True
+    
+    # 公式コメントを除外（条件を1つのマスクにまとめる）
+    keep = official_comment_exclusion_mask(df).to_numpy(dtype=bool)
+    
+    # 質問コメントを結合（商品への質問 → 簡易判定 → AI判定の順）し、1回の抽出でデータフレームを作成
+    positions = np.concatenate([
+        np.flatnonzero(product_mask & keep),
+        np.flatnonzero(pattern_mask & keep),
+        np.flatnonzero(ai_mask & keep),
+    ])
+    return df.take(positions).reset_index(drop=True)
 
 